@@ -0,0 +1,26 @@
+"""
+生成英文词表的 Bloom 过滤器 words.bloom，供 server.py 在配置了 MiniMax 时跳过不在词表中的查询
+用法: python build_bloom.py words.txt [words.bloom]
+词表每行一个单词，最好是 Free Dictionary 实际返回过 200 的单词；词表越偏离 Free Dictionary 的收录范围，
+被误交给 MiniMax 的单词越多。带连字符/撇号的单词 server.py 不做过滤，词表可只含纯字母单词。建议每月重新生成
+"""
+import sys
+from pybloom_live import BloomFilter
+
+
+def build(words_path, out_path='words.bloom'):
+    with open(words_path, encoding='utf-8') as f:
+        words = {line.strip().lower() for line in f if line.strip()}
+    bloom = BloomFilter(capacity=max(len(words), 500000), error_rate=0.01)
+    for w in words:
+        bloom.add(w)
+    with open(out_path, 'wb') as f:
+        bloom.tofile(f)
+    print(f'已写入 {out_path}，词数: {len(words)}')
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    build(*sys.argv[1:3])
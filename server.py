@@ -1,43 +1,305 @@
 """
-VocabVault 后端 - Flask
+VocabVault 后端 - Quart（异步版 Flask）
 提供 / 返回前端页面，/api/search 查词（优先 Free Dictionary API，回退 MiniMax）
 支持云端同步（Supabase）
 """
 import os
 import re
-import json
-import requests
+import string
+import hashlib
+import asyncio
+import random
+import gzip
+import httpx
+import ijson
+import orjson
+import redis.asyncio as redis
+from collections import OrderedDict
 from urllib.parse import quote
-from flask import Flask, request, jsonify, send_from_directory
-from supabase import create_client, Client
+from pybloom_live import BloomFilter
+from quart import Quart, Response, request, jsonify
+from quart.json.provider import DefaultJSONProvider
+from psycopg import sql
+from psycopg.types.json import Jsonb, set_json_dumps, set_json_loads
+from psycopg_pool import AsyncConnectionPool
 
 BASE = os.path.dirname(os.path.abspath(__file__))
-app = Flask(__name__, static_folder=BASE, static_url_path='')
+
+# 首页部署后不变：启动时读入内存并预先 gzip
+with open(os.path.join(BASE, 'index.html'), 'rb') as f:
+    INDEX_HTML = f.read()
+INDEX_HTML_GZIP = gzip.compress(INDEX_HTML, 9)
+INDEX_ETAG = hashlib.blake2b(INDEX_HTML, digest_size=8).hexdigest()
+# 有 ETag 可廉价校验，缓存时间短一些，部署新版本后更快生效
+INDEX_MAX_AGE = 300
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """用 orjson 处理 jsonify / request.get_json，比标准库 json 快数倍"""
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+
+class IndexMiddleware:
+    """ASGI 中间件：首页请求在进入 Quart 路由之前直接返回内存中的页面"""
+
+    def __init__(self, asgi_app):
+        self.asgi_app = asgi_app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope['method'] not in ('GET', 'HEAD') or scope['path'] not in ('/', '/index.html'):
+            return await self.asgi_app(scope, receive, send)
+        request_headers = dict(scope['headers'])
+        use_gzip = b'gzip' in request_headers.get(b'accept-encoding', b'')
+        body = INDEX_HTML_GZIP if use_gzip else INDEX_HTML
+        # gzip 与原文是不同的表示，ETag 需区分
+        etag = f'"{INDEX_ETAG}-gzip"' if use_gzip else f'"{INDEX_ETAG}"'
+        headers = [
+            (b'etag', etag.encode()),
+            (b'cache-control', f'public, max-age={INDEX_MAX_AGE}'.encode()),
+            (b'vary', b'Accept-Encoding')
+        ]
+        if etag.encode() in request_headers.get(b'if-none-match', b''):
+            await send({'type': 'http.response.start', 'status': 304, 'headers': headers})
+            await send({'type': 'http.response.body', 'body': b''})
+            return
+        headers += [
+            (b'content-type', b'text/html; charset=utf-8'),
+            (b'content-length', str(len(body)).encode())
+        ]
+        if use_gzip:
+            headers.append((b'content-encoding', b'gzip'))
+        await send({'type': 'http.response.start', 'status': 200, 'headers': headers})
+        await send({'type': 'http.response.body', 'body': b'' if scope['method'] == 'HEAD' else body})
+
+
+app = Quart(__name__, static_folder=BASE, static_url_path='')
+app.json = OrjsonProvider(app)
+app.asgi_app = IndexMiddleware(app.asgi_app)
 
 # 从环境变量读取，Render 上可配置
 MINIMAX_API_KEY = os.environ.get('MINIMAX_API_KEY', '')
 
-# Supabase 配置
-SUPABASE_URL = os.environ.get('SUPABASE_URL', '')
-SUPABASE_KEY = os.environ.get('SUPABASE_KEY', '')
+# Supabase 配置：直连其 Postgres（连接串见 Supabase 控制台 Database 设置，
+# 需用直连或 Session 模式端口，Transaction 模式的连接池不支持预编译语句）
+SUPABASE_DB_URL = os.environ.get('SUPABASE_DB_URL', '')
 
-# 初始化 Supabase 客户端（如果配置了）
-supabase: Client = None
-if SUPABASE_URL and SUPABASE_KEY:
+# 数据库连接池，在 startup() 中打开
+POOL_OPEN_TIMEOUT = 10
+pool: AsyncConnectionPool = None
+if SUPABASE_DB_URL:
+    pool = AsyncConnectionPool(SUPABASE_DB_URL, min_size=1, max_size=10, open=False)
+else:
+    print('Supabase 未配置: SUPABASE_DB_URL 为空')
+set_json_dumps(orjson.dumps)
+set_json_loads(orjson.loads)
+
+# Redis 缓存（可选），未配置时每次查词都直连上游
+REDIS_URL = os.environ.get('REDIS_URL', '')
+cache = None
+if REDIS_URL:
     try:
-        supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
-        print(f'Supabase 初始化成功, URL: {SUPABASE_URL[:30]}...')
+        cache = redis.Redis.from_url(REDIS_URL)
+        print('Redis 初始化成功')
     except Exception as e:
-        print('Supabase 初始化失败:', e)
+        print('Redis 初始化失败:', e)
 else:
-    print('Supabase 未配置: SUPABASE_URL 或 SUPABASE_KEY 为空')
+    print('Redis 未配置: REDIS_URL 为空，查词结果不缓存')
+
+DICT_CACHE_PREFIX = 'vv:dict:'
+DICT_CACHE_TTL = 7 * 86400
+# 浏览器 / CDN 对查词结果的缓存时长
+SEARCH_MAX_AGE = 86400
+# LLM 调用按量计费，缓存更久
+MINIMAX_CACHE_PREFIX = 'vv:mm:'
+MINIMAX_CACHE_TTL = 30 * 86400
 
 FREE_DICT_URL = 'https://api.dictionaryapi.dev/api/v2/entries/en'
 MINIMAX_URL = 'https://api.minimax.io/anthropic/v1/messages'
+MINIMAX_MODEL = 'MiniMax-M2.5'
+MINIMAX_HEADERS = {
+    'Authorization': 'Bearer ' + MINIMAX_API_KEY,
+    'Content-Type': 'application/json'
+}
+PROMPT_TEMPLATE = '''你是一个专业的英语词典和语言学习助手。请为用户提供关于"{query}"的详细信息，包括：
+1. 单词/短语及其正确拼写
+2. 音标（IPA格式）
+3. 词性（名词/动词/形容词/副词/短语等）
+4. 详细的中文释义
+5. 至少3个英文例句（带中文翻译）
+6. 同义词
+7. 使用场景说明
+
+请以JSON格式返回结果，格式如下：
+{{
+  "word": "查询的单词或短语",
+  "phonetic": "音标",
+  "partOfSpeech": "词性",
+  "definitions": [
+    {{ "meaning": "释义内容", "example": "例句", "translation": "例句翻译" }}
+  ],
+  "synonyms": ["同义词1", "同义词2"],
+  "usage": "使用说明"
+}}'''
+# 请求体除查询词外固定不变：预先序列化，按占位符切成前后两段，每次只需拼接转义后的查询词
+MINIMAX_BODY_PREFIX, MINIMAX_BODY_SUFFIX = orjson.dumps({
+    'model': MINIMAX_MODEL,
+    'max_tokens': 2000,
+    'system': [{'type': 'text', 'text': '你是一个专业的英语词典和语言学习助手，擅长解释单词、短语和表达方式的含义、用法和例句。'}],
+    'messages': [{'role': 'user', 'content': [{'type': 'text', 'text': PROMPT_TEMPLATE.format(query='@@QUERY@@')}]}],
+    'temperature': 1.0
+}).split(b'@@QUERY@@')
+
+# 英文词表的 Bloom 过滤器（可选，由 build_bloom.py 生成）：配置了 MiniMax 时，
+# 不在词表中的查询（短语等）直接交给 MiniMax，省去一次大概率 404 的 Free Dictionary 往返。
+# 过滤器只能保证“不在词表中”，词表不等于 Free Dictionary 的收录范围，见 maybe_in_free_dict()
+BLOOM_PATH = os.path.join(BASE, 'words.bloom')
+FREEDICT_BLOOM = None
+if os.path.exists(BLOOM_PATH):
+    try:
+        with open(BLOOM_PATH, 'rb') as f:
+            FREEDICT_BLOOM = BloomFilter.fromfile(f)
+        print('Bloom 过滤器加载成功, 词数:', len(FREEDICT_BLOOM))
+    except Exception as e:
+        print('Bloom 过滤器加载失败:', e)
+else:
+    print('未找到 words.bloom，所有查询都会请求 Free Dictionary')
+
+# 单词判定（纯字母、连字符、撇号），集合查找比正则快
+WORD_CHARS = frozenset(string.ascii_letters + "-'")
+# 从 MiniMax 回复中提取 JSON：优先 ```json 代码块，其次第一个完整的 {...}（见 find_json_object）
+JSON_BLOCK_RE = re.compile(r'```json\s*([\s\S]*?)\s*```')
+
+# Free Dictionary 对未收录的词通常很快 404，偶尔挂起：连接 2s、读取 4s 超时，
+# 仅在连接失败或网关错误时重试一次（指数退避 + 随机抖动）
+FREE_DICT_TIMEOUT = httpx.Timeout(4.0, connect=2.0)
+FREE_DICT_RETRIES = 1
+FREE_DICT_BACKOFF = 0.1
+FREE_DICT_RETRY_STATUSES = (502, 503, 504)
 
 # 部分环境要求带 User-Agent
 FREE_DICT_HEADERS = {'User-Agent': 'VocabVault/1.0 (https://vocabvault-k72p.onrender.com)'}
 
+# 全局复用的 HTTP/2 客户端，同一上游的并发请求复用一条 TLS 连接，在 startup() 中创建
+http: httpx.AsyncClient = None
+
+# 进程内 LRU：{响应体 SHA-1 摘要: 转换结果}，只保留摘要，不保留原始响应体
+TRANSFORM_CACHE = OrderedDict()
+TRANSFORM_CACHE_SIZE = 2048
+
+# 进行中的上游请求：{key: {'task': Task, 'waiters': 等待数}}，相同查询并发到达时只请求一次
+IN_FLIGHT = {}
+
+
+@app.before_serving
+async def startup():
+    global http
+    http = httpx.AsyncClient(
+        http2=True,
+        headers=FREE_DICT_HEADERS,
+        timeout=httpx.Timeout(30.0, connect=2.0),
+        limits=httpx.Limits(max_keepalive_connections=32, max_connections=64)
+    )
+    if pool:
+        # 不等待建连：数据库暂时不可达时连接池会在后台持续重连；
+        # 另取一次连接做启动检查，连接串有误时在启动日志中报错
+        await pool.open()
+        try:
+            async with pool.connection(timeout=POOL_OPEN_TIMEOUT):
+                pass
+            print('Supabase 数据库连接池初始化成功')
+        except Exception as e:
+            print('Supabase 数据库连接池初始化失败:', e)
+
+
+@app.after_serving
+async def shutdown():
+    await http.aclose()
+    if pool:
+        await pool.close()
+    if cache:
+        await cache.aclose()
+
+
+async def cache_get(key):
+    """读取缓存的 JSON 字节串，未命中或 Redis 不可用时返回 None"""
+    if not cache:
+        return None
+    try:
+        return await cache.get(key)
+    except Exception as e:
+        print('Redis 读取失败:', e)
+        return None
+
+
+async def cache_set(key, body, ttl):
+    """写入 JSON 字节串，失败时仅打印日志，不影响查词"""
+    if not cache:
+        return
+    try:
+        await cache.setex(key, ttl, body)
+    except Exception as e:
+        print('Redis 写入失败:', e)
+
+
+def is_word(query):
+    """是否为单个英文单词（可含连字符、撇号）"""
+    return bool(query) and all(c in WORD_CHARS for c in query)
+
+
+def find_json_object(text):
+    """单次扫描找出第一个括号配对完整的 {...}（忽略字符串内的括号），找不到返回 None"""
+    start = text.find('{')
+    if start < 0:
+        return None
+    depth = 0
+    in_str = False
+    escaped = False
+    for i in range(start, len(text)):
+        c = text[i]
+        if in_str:
+            if escaped:
+                escaped = False
+            elif c == '\\':
+                escaped = True
+            elif c == '"':
+                in_str = False
+        elif c == '"':
+            in_str = True
+        elif c == '{':
+            depth += 1
+        elif c == '}':
+            depth -= 1
+            if depth == 0:
+                return text[start:i + 1]
+    return None
+
+
+def maybe_in_free_dict(query):
+    """是否需要请求 Free Dictionary；返回 False 仅表示查询不在 Bloom 过滤器的词表中。
+    未加载过滤器或未配置 MiniMax（跳过后用户将拿不到任何结果）时总返回 True；
+    常见词表只含纯字母单词，带连字符/撇号的单词（如 well-being、o'clock）也不做过滤"""
+    if FREEDICT_BLOOM is None or not MINIMAX_API_KEY:
+        return True
+    if is_word(query) and ('-' in query or "'" in query):
+        return True
+    return query.lower() in FREEDICT_BLOOM
+
+
+def minimax_request_body(query):
+    """拼接 MiniMax 请求体（JSON 字节串），查询词按 JSON 字符串规则转义"""
+    return MINIMAX_BODY_PREFIX + orjson.dumps(query)[1:-1] + MINIMAX_BODY_SUFFIX
+
+
+def minimax_cache_key(query):
+    """MiniMax 缓存键：模型名 + 小写查询的 BLAKE2b 摘要"""
+    digest = hashlib.blake2b(f'{MINIMAX_MODEL}|{query.lower()}'.encode(), digest_size=16).hexdigest()
+    return MINIMAX_CACHE_PREFIX + digest
+
 
 def transform_free_dictionary(data):
     """将 Free Dictionary API 响应转为前端统一格式"""
@@ -49,19 +311,25 @@ def transform_free_dictionary(data):
         if p.get('audio'):
             audio_url = p['audio'] if p['audio'].startswith('http') else 'https:' + p['audio']
             break
-    definitions = []
-    for m in first.get('meanings', []):
-        for d in m.get('definitions', []):
+    # 单次遍历同时收集释义与同义词
+    definitions, synonyms = [], []
+    for m in first.get('meanings') or ():
+        for d in m.get('definitions') or ():
             definitions.append({
                 'meaning': d.get('definition', ''),
                 'example': d.get('example', ''),
                 'translation': ''
             })
-    synonyms = []
-    for m in first.get('meanings', []):
-        for d in m.get('definitions', []):
-            synonyms.extend(d.get('synonyms', []))
-    synonyms = list(dict.fromkeys(synonyms))[:10]
+            syn = d.get('synonyms')
+            if syn:
+                synonyms.extend(syn)
+    # 去重并最多保留 10 个，凑满即停止
+    unique_synonyms = {}
+    for syn in synonyms:
+        unique_synonyms[syn] = None
+        if len(unique_synonyms) == 10:
+            break
+    synonyms = list(unique_synonyms)
     first_meaning = (first.get('meanings') or [{}])[0]
     return {
         'word': first['word'],
@@ -74,132 +342,244 @@ def transform_free_dictionary(data):
     }
 
 
-@app.route('/')
-def index():
-    return send_from_directory(BASE, 'index.html')
+def transform_free_dictionary_body(body):
+    """按响应体的 SHA-1 缓存转换结果（已序列化的 JSON 字节串），热门单词无需重复解析与转换"""
+    digest = hashlib.sha1(body).digest()
+    if digest in TRANSFORM_CACHE:
+        TRANSFORM_CACHE.move_to_end(digest)
+        return TRANSFORM_CACHE[digest]
+    out = transform_free_dictionary(orjson.loads(body))
+    out = orjson.dumps(out) if out else None
+    TRANSFORM_CACHE[digest] = out
+    if len(TRANSFORM_CACHE) > TRANSFORM_CACHE_SIZE:
+        TRANSFORM_CACHE.popitem(last=False)
+    return out
+
+
+async def coalesce(key, factory):
+    """合并相同 key 的并发上游请求：只有第一个调用真正执行 factory()，其余等待同一结果。
+    单个等待方被取消不影响其他等待方，最后一个等待方取消时才取消上游请求。"""
+    entry = IN_FLIGHT.get(key)
+    if entry is None:
+        entry = {'task': asyncio.create_task(factory()), 'waiters': 0}
+        IN_FLIGHT[key] = entry
+        entry['task'].add_done_callback(lambda _: IN_FLIGHT.get(key) is entry and IN_FLIGHT.pop(key))
+    entry['waiters'] += 1
+    try:
+        return await asyncio.shield(entry['task'])
+    except asyncio.CancelledError:
+        if entry['waiters'] == 1:
+            # 先同步移除，避免随后到达的相同请求加入一个正在被取消的任务
+            if IN_FLIGHT.get(key) is entry:
+                del IN_FLIGHT[key]
+            entry['task'].cancel()
+        raise
+    finally:
+        entry['waiters'] -= 1
+
+
+async def fetch_free_dict(query):
+    """查询 Free Dictionary（单词和短语都试，短语可能 404），命中返回统一格式的 JSON 字节串，否则返回 None"""
+    dict_key = DICT_CACHE_PREFIX + query.lower()
+    cached = await cache_get(dict_key)
+    if cached:
+        return cached
+
+    url = f'{FREE_DICT_URL}/{quote(query, safe="")}'
+    for attempt in range(FREE_DICT_RETRIES + 1):
+        if attempt:
+            await asyncio.sleep(FREE_DICT_BACKOFF * 2 ** (attempt - 1) * (1 + random.random()))
+        try:
+            r = await http.get(url, timeout=FREE_DICT_TIMEOUT)
+            if r.status_code in FREE_DICT_RETRY_STATUSES and attempt < FREE_DICT_RETRIES:
+                continue
+            if r.status_code == 200:
+                out = transform_free_dictionary_body(r.content)
+                if out:
+                    await cache_set(dict_key, out, DICT_CACHE_TTL)
+                    return out
+            return None
+        except (httpx.ConnectError, httpx.ConnectTimeout) as e:
+            print('Free Dictionary 连接失败:', str(e) or type(e).__name__)
+        except httpx.HTTPError as e:
+            print('Free Dictionary API 失败:', str(e) or type(e).__name__)
+            return None
+        except Exception as e:
+            print('Free Dictionary 解析异常:', e)
+            return None
+    return None
+
+
+async def read_first_text_block(r):
+    """流式解析 MiniMax 响应，返回第一个 text 块的内容，不缓冲整个响应体"""
+    items = ijson.sendable_list()
+    parser = ijson.items_coro(items, 'content.item')
+    async for chunk in r.aiter_bytes():
+        parser.send(chunk)
+        for item in items:
+            if item.get('type') == 'text':
+                return item.get('text', '')
+        del items[:]
+    # 结束解析：响应体不完整时抛出 ijson.IncompleteJSONError
+    parser.close()
+    return ''
+
+
+def parse_json_content(content):
+    """从 MiniMax 回复中解析 JSON：先试 ```json 代码块，再试第一个完整的 {...}，都失败时返回 None"""
+    m = JSON_BLOCK_RE.search(content)
+    if m:
+        try:
+            return orjson.loads(m.group(1))
+        except orjson.JSONDecodeError:
+            pass
+    obj = find_json_object(content)
+    if obj:
+        try:
+            return orjson.loads(obj)
+        except orjson.JSONDecodeError:
+            pass
+    return None
+
+
+async def fetch_minimax(query):
+    """调用 MiniMax 查询短语/表达，返回 (响应数据, 状态码)"""
+    mm_key = minimax_cache_key(query)
+    cached = await cache_get(mm_key)
+    if cached:
+        return orjson.loads(cached), 200
+
+    try:
+        async with http.stream(
+            'POST',
+            MINIMAX_URL,
+            content=minimax_request_body(query),
+            headers=MINIMAX_HEADERS
+        ) as r:
+            # 打印响应以便调试
+            print('MiniMax 响应状态:', r.status_code)
+            if r.status_code != 200:
+                await r.aread()
+                print('MiniMax 错误响应:', r.text[:500])
+            r.raise_for_status()
+            content = await read_first_text_block(r)
+        if not content:
+            return {'error': '未找到文本内容'}, 500
+        # 解析 JSON 块，只缓存解析后的结果；解析不出时原样返回文本
+        parsed = parse_json_content(content)
+        if parsed is not None:
+            await cache_set(mm_key, orjson.dumps(parsed), MINIMAX_CACHE_TTL)
+            return parsed, 200
+        return {'word': query, 'rawResponse': content, 'isRawFormat': True}, 200
+    except (httpx.HTTPError, ijson.JSONError) as e:
+        # ijson.JSONError：状态 200 但响应体不是 JSON（代理错误页、被截断的流等）
+        # 返回更详细的错误信息给前端（状态码 200 让前端能显示错误信息）
+        return {
+            'error': f'短语查询暂时不可用。请确认已在 Render 环境变量中配置 MINIMAX_API_KEY。错误详情: {str(e)[:100]}'
+        }, 200
 
 
 @app.route('/api/health')
-def health():
+async def health():
     return jsonify({'ok': True, 'service': 'vocabvault'})
 
 
-@app.route('/api/search', methods=['POST'])
-def search():
-    data = request.get_json() or {}
-    query = data.get('query', '').strip()
+async def search_result_response(body):
+    """查词成功结果：带 ETag 与 Cache-Control，浏览器重复查询时直接返回 304"""
+    response = Response(body, mimetype='application/json')
+    response.set_etag(hashlib.blake2b(body, digest_size=8).hexdigest())
+    response.cache_control.public = True
+    response.cache_control.max_age = SEARCH_MAX_AGE
+    return await response.make_conditional(request)
+
+
+@app.route('/api/search', methods=['GET', 'POST'])
+async def search():
+    # GET ?query=... 可被浏览器缓存；POST JSON 保留兼容
+    if request.method == 'GET':
+        query = request.args.get('query', '').strip()
+    else:
+        data = await request.get_json() or {}
+        query = data.get('query', '').strip()
     if not query:
         return jsonify({'error': '请提供查询内容'}), 400
 
-    # 先尝试 Free Dictionary API（单词和短语都试，短语可能 404）
-    encoded = quote(query, safe="")
+    # 先查 Free Dictionary（配置了 MiniMax 且 Bloom 过滤器判定不在词表时跳过）；明显不是单词
+    # （短语/表达）时同时发起 MiniMax，避免等 Free Dictionary 超时后再串行调用
+    key = query.lower()
+    task_dict = None
+    if maybe_in_free_dict(key):
+        task_dict = asyncio.create_task(coalesce(('dict', key), lambda: fetch_free_dict(query)))
+    task_mm = None
+    if MINIMAX_API_KEY and not is_word(query):
+        task_mm = asyncio.create_task(coalesce(('mm', key), lambda: fetch_minimax(query)))
     try:
-        r = requests.get(
-            f'{FREE_DICT_URL}/{encoded}',
-            timeout=10,
-            headers=FREE_DICT_HEADERS
-        )
-        if r.status_code == 200:
-            out = transform_free_dictionary(r.json())
-            if out:
-                return jsonify(out)
-    except requests.RequestException as e:
-        err_msg = getattr(e, 'message', str(e))
-        if hasattr(e, 'response') and e.response is not None:
-            try:
-                err_msg = e.response.text[:200] if e.response.text else str(e)
-            except Exception:
-                pass
-        print('Free Dictionary API 失败:', err_msg)
-    except Exception as e:
-        print('Free Dictionary 解析异常:', e)
+        out = await task_dict if task_dict else None
+        if out:
+            return await search_result_response(out)
+
+        # 短语/表达或 Free Dictionary 未命中：使用 MiniMax
+        if not MINIMAX_API_KEY:
+            return jsonify({
+                'error': '短语与表达类查询需在 Render 环境变量中配置 MINIMAX_API_KEY 后才能使用。'
+            }), 200
+        result, status = await (task_mm or coalesce(('mm', key), lambda: fetch_minimax(query)))
+        # 错误信息、未解析的原始回复以及非对象结果（如 JSON 数组）不缓存
+        if status == 200 and isinstance(result, dict) and 'error' not in result and not result.get('isRawFormat'):
+            return await search_result_response(orjson.dumps(result))
+        return jsonify(result), status
+    finally:
+        # Free Dictionary 已命中（或客户端断开）时取消仍在进行的 MiniMax 请求
+        if task_mm and not task_mm.done():
+            task_mm.cancel()
 
-    # 短语/表达或 Free Dictionary 未命中：使用 MiniMax
-    if not MINIMAX_API_KEY:
-        return jsonify({
-            'error': '短语与表达类查询需在 Render 环境变量中配置 MINIMAX_API_KEY 后才能使用。'
-        }), 200
 
-    prompt = f'''你是一个专业的英语词典和语言学习助手。请为用户提供关于"{query}"的详细信息，包括：
-1. 单词/短语及其正确拼写
-2. 音标（IPA格式）
-3. 词性（名词/动词/形容词/副词/短语等）
-4. 详细的中文释义
-5. 至少3个英文例句（带中文翻译）
-6. 同义词
-7. 使用场景说明
+# ========== 数据同步 API ==========
 
-请以JSON格式返回结果，格式如下：
-{{
-  "word": "查询的单词或短语",
-  "phonetic": "音标",
-  "partOfSpeech": "词性",
-  "definitions": [
-    {{ "meaning": "释义内容", "example": "例句", "translation": "例句翻译" }}
-  ],
-  "synonyms": ["同义词1", "同义词2"],
-  "usage": "使用说明"
-}}'''
+# 前端可同步的 vocabulary 字段（created_at 等由数据库默认值生成）
+VOCAB_COLUMNS = ('id', 'word', 'phonetic', 'audio_url', 'meanings', 'date_added', 'tags', 'notes')
 
-    try:
-        r = requests.post(
-            MINIMAX_URL,
-            json={
-                'model': 'MiniMax-M2.5',
-                'max_tokens': 2000,
-                'system': [{'type': 'text', 'text': '你是一个专业的英语词典和语言学习助手，擅长解释单词、短语和表达方式的含义、用法和例句。'}],
-                'messages': [{'role': 'user', 'content': [{'type': 'text', 'text': prompt}]}],
-                'temperature': 1.0
-            },
-            headers={
-                'Authorization': 'Bearer ' + MINIMAX_API_KEY,
-                'Content-Type': 'application/json'
-            },
-            timeout=30
-        )
-        # 打印响应以便调试
-        print('MiniMax 响应状态:', r.status_code)
-        if r.status_code != 200:
-            print('MiniMax 错误响应:', r.text[:500])
-        r.raise_for_status()
-        resp = r.json()
-        content_list = resp.get('content') or []
-        content = ''
-        for item in content_list:
-            if item.get('type') == 'text':
-                content = item.get('text', '')
-                break
-        if not content:
-            return jsonify({'error': '未找到文本内容'}), 500
-        # 解析 JSON 块
-        m = re.search(r'```json\s*([\s\S]*?)\s*```', content)
-        if m:
-            return jsonify(json.loads(m.group(1)))
-        m = re.search(r'\{[\s\S]*\}', content)
-        if m:
-            return jsonify(json.loads(m.group(0)))
-        return jsonify({'word': query, 'rawResponse': content, 'isRawFormat': True})
-    except requests.RequestException as e:
-        err_body = ''
-        if hasattr(e, 'response') and e.response is not None:
-            err_body = e.response.text[:300]
-        # 返回更详细的错误信息给前端
-        return jsonify({
-            'error': f'短语查询暂时不可用。请确认已在 Render 环境变量中配置 MINIMAX_API_KEY。错误详情: {str(e)[:100]}'
-        }), 200  # 返回 200 让前端能显示错误信息
 
+def vocab_columns(columns):
+    return sql.SQL(', ').join(map(sql.Identifier, columns))
+
+
+# JSON 文档统一经 jsonb_populate_record 转为 vocabulary 行，由数据库按列类型转换
+SAVE_VOCAB_SQL = sql.SQL("""
+    INSERT INTO vocabulary ({cols})
+    SELECT {cols} FROM vocabulary_in, jsonb_populate_record(NULL::vocabulary, doc)
+    ON CONFLICT (id) DO UPDATE SET {updates}
+    WHERE ({old}) IS DISTINCT FROM ({new})
+""").format(
+    cols=vocab_columns(VOCAB_COLUMNS),
+    updates=sql.SQL(', ').join(
+        sql.SQL('{0} = EXCLUDED.{0}').format(sql.Identifier(c)) for c in VOCAB_COLUMNS[1:]
+    ),
+    old=sql.SQL(', ').join(sql.SQL('vocabulary.{}::text').format(sql.Identifier(c)) for c in VOCAB_COLUMNS[1:]),
+    new=sql.SQL(', ').join(sql.SQL('EXCLUDED.{}::text').format(sql.Identifier(c)) for c in VOCAB_COLUMNS[1:])
+)
+DELETE_REMOVED_VOCAB_SQL = sql.SQL("""
+    DELETE FROM vocabulary v WHERE NOT EXISTS (
+        SELECT 1 FROM vocabulary_in, jsonb_populate_record(NULL::vocabulary, doc) r WHERE r.id = v.id
+    )
+""")
 
-# ========== 数据同步 API ==========
 
 @app.route('/api/sync/load', methods=['GET'])
-def load_data():
+async def load_data():
     """加载云端数据"""
-    print('load_data called, supabase is:', supabase)
-    if not supabase:
+    print('load_data called, pool is:', pool)
+    if not pool:
         return jsonify({'error': 'Cloud sync not configured'}), 500
     try:
-        response = supabase.table('vocabulary').select('*').order('created_at', desc=True).execute()
-        vocabulary = response.data or []
+        async with pool.connection() as conn:
+            cur = await conn.execute(
+                "SELECT coalesce(json_agg(v ORDER BY v.created_at DESC), '[]') FROM vocabulary v",
+                prepare=True
+            )
+            vocabulary = (await cur.fetchone())[0]
+            cur = await conn.execute('SELECT tag FROM custom_tags', prepare=True)
+            custom_tags = [row[0] for row in await cur.fetchall()]
         # 转为前端驼峰格式
         def to_front_item(row):
             return {
@@ -214,11 +594,9 @@ def load_data():
             }
         vocabulary = [to_front_item(r) for r in vocabulary]
         print('Loaded vocabulary count:', len(vocabulary))
-        tags_response = supabase.table('custom_tags').select('*').execute()
-        custom_tags = tags_response.data or []
         return jsonify({
             'vocabulary': vocabulary,
-            'customTags': [t['tag'] for t in custom_tags]
+            'customTags': custom_tags
         })
     except Exception as e:
         print('加载数据失败:', e)
@@ -226,18 +604,18 @@ def load_data():
 
 
 @app.route('/api/sync/save', methods=['POST'])
-def save_data():
+async def save_data():
     """保存数据到云端（完整覆盖）"""
-    print('save_data called, supabase:', supabase)
-    if not supabase:
+    print('save_data called, pool:', pool)
+    if not pool:
         return jsonify({'error': 'Cloud sync not configured'}), 500
-    data = request.get_json() or {}
+    data = await request.get_json() or {}
     vocabulary = data.get('vocabulary', [])
     custom_tags = data.get('customTags', [])
     print('Saving vocabulary count:', len(vocabulary))
     print('Saving custom_tags:', custom_tags)
     try:
-        # 转换前端驼峰字段为 Supabase 下划线字段
+        # 转换前端驼峰字段为数据库下划线字段
         def to_db_item(v):
             return {
                 'id': v.get('id'),
@@ -249,15 +627,27 @@ def save_data():
                 'tags': v.get('tags'),
                 'notes': v.get('notes')
             }
-        # 先清空再逐条插入
-        supabase.table('vocabulary').delete().neq('id', 'x' * 100).execute()
-        for v in vocabulary:
-            supabase.table('vocabulary').insert(to_db_item(v)).execute()
-        
-        supabase.table('custom_tags').delete().neq('id', -1).execute()
-        for t in custom_tags:
-            supabase.table('custom_tags').insert({'tag': t}).execute()
-        
+        # 单个事务内：COPY 到临时表，只 upsert 新增/变化的行，再删除本地已不存在的行
+        async with pool.connection() as conn, conn.transaction():
+            await conn.execute('CREATE TEMP TABLE vocabulary_in (doc jsonb) ON COMMIT DROP')
+            async with conn.cursor() as cur:
+                async with cur.copy('COPY vocabulary_in (doc) FROM STDIN') as copy:
+                    for v in vocabulary:
+                        await copy.write_row((Jsonb(to_db_item(v)),))
+                await cur.execute(SAVE_VOCAB_SQL)
+                print('Upserted vocabulary count:', cur.rowcount)
+                await cur.execute(DELETE_REMOVED_VOCAB_SQL)
+                print('Removed vocabulary count:', cur.rowcount)
+
+            # custom_tags 以自增 id 为主键，按 tag 文本做差异
+            await conn.execute('DELETE FROM custom_tags WHERE NOT (tag = ANY(%s::text[]))', (custom_tags,), prepare=True)
+            await conn.execute(
+                'INSERT INTO custom_tags (tag) SELECT DISTINCT t FROM unnest(%s::text[]) t '
+                'WHERE NOT EXISTS (SELECT 1 FROM custom_tags c WHERE c.tag = t)',
+                (custom_tags,),
+                prepare=True
+            )
+
         return jsonify({'ok': True})
     except Exception as e:
         print('保存数据失败:', e)
@@ -267,13 +657,17 @@ def save_data():
 
 
 @app.route('/api/sync/add', methods=['POST'])
-def add_word():
+async def add_word():
     """添加单个词汇"""
-    if not supabase:
+    if not pool:
         return jsonify({'error': 'Cloud sync not configured'}), 500
-    word = request.get_json() or {}
+    word = await request.get_json() or {}
     try:
-        supabase.table('vocabulary').insert(word).execute()
+        query = sql.SQL(
+            'INSERT INTO vocabulary ({cols}) SELECT {cols} FROM jsonb_populate_record(NULL::vocabulary, %s)'
+        ).format(cols=vocab_columns(word))
+        async with pool.connection() as conn:
+            await conn.execute(query, (Jsonb(word),), prepare=True)
         return jsonify({'ok': True})
     except Exception as e:
         print('添加词汇失败:', e)
@@ -281,12 +675,13 @@ def add_word():
 
 
 @app.route('/api/sync/delete/<word_id>', methods=['DELETE'])
-def delete_word(word_id):
+async def delete_word(word_id):
     """删除单个词汇"""
-    if not supabase:
+    if not pool:
         return jsonify({'error': 'Cloud sync not configured'}), 500
     try:
-        supabase.table('vocabulary').delete().eq('id', word_id).execute()
+        async with pool.connection() as conn:
+            await conn.execute('DELETE FROM vocabulary WHERE id = %s', (word_id,), prepare=True)
         return jsonify({'ok': True})
     except Exception as e:
         print('删除词汇失败:', e)
@@ -294,21 +689,26 @@ def delete_word(word_id):
 
 
 @app.route('/api/sync/update', methods=['POST'])
-def update_word():
+async def update_word():
     """更新词汇"""
-    if not supabase:
+    if not pool:
         return jsonify({'error': 'Cloud sync not configured'}), 500
-    data = request.get_json() or {}
-    word_id = data.get('id')
-    updates = {k: v for k, v in data.items() if k != 'id'}
+    data = await request.get_json() or {}
+    updates = [k for k in data if k != 'id']
     try:
-        supabase.table('vocabulary').update(updates).eq('id', word_id).execute()
+        query = sql.SQL(
+            'UPDATE vocabulary SET ({cols}) = (SELECT {cols} FROM jsonb_populate_record(NULL::vocabulary, %(doc)s)) '
+            'WHERE id = (SELECT id FROM jsonb_populate_record(NULL::vocabulary, %(doc)s))'
+        ).format(cols=vocab_columns(updates))
+        async with pool.connection() as conn:
+            await conn.execute(query, {'doc': Jsonb(data)}, prepare=True)
         return jsonify({'ok': True})
     except Exception as e:
         print('更新词汇失败:', e)
         return jsonify({'error': str(e)}), 500
 
 
+# 生产环境用 uvicorn 多进程运行（见 Procfile），这里仅供本地开发
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 3000))
     app.run(host='0.0.0.0', port=port)